@@ -0,0 +1,122 @@
+import asyncio
+import os
+import time
+from fastapi.responses import JSONResponse
+
+# Every route is a plain `def`, so they all share anyio's worker threads.
+# Slow LLM endpoints get their own small lane so a burst of them can't take
+# every thread away from CRUD, search and /health.
+THREADPOOL_SIZE = int(os.getenv("THREADPOOL_SIZE", "40"))
+
+LLM_PATHS = ("/api/generate", "/api/parse-linkedin")
+EXEMPT_PATHS = ("/", "/health", "/metrics")
+
+
+class Lane:
+    def __init__(self, name: str, concurrency: int, queue_size: int, max_wait: float, retry_after: int):
+        self.name = name
+        self.concurrency = concurrency
+        self.queue_size = queue_size
+        self.max_wait = max_wait
+        self.retry_after = retry_after
+        self.semaphore = asyncio.Semaphore(concurrency)
+        self.active = 0
+        self.waiting = 0
+        self.admitted = 0
+        self.shed = 0
+        self.total_wait_ms = 0.0
+        self.max_wait_ms = 0.0
+
+    def stats(self) -> dict:
+        return {
+            "concurrency": self.concurrency,
+            "active": self.active,
+            "queue_depth": self.waiting,
+            "admitted": self.admitted,
+            "shed": self.shed,
+            "avg_wait_ms": round(self.total_wait_ms / self.admitted, 2) if self.admitted else 0.0,
+            "max_wait_ms": round(self.max_wait_ms, 2),
+        }
+
+
+LANES = {
+    "llm": Lane(
+        "llm",
+        concurrency=int(os.getenv("LLM_LANE_CONCURRENCY", "8")),
+        queue_size=int(os.getenv("LLM_LANE_QUEUE", "16")),
+        max_wait=float(os.getenv("LLM_LANE_MAX_WAIT", "10")),
+        retry_after=10,
+    ),
+    "default": Lane(
+        "default",
+        concurrency=int(os.getenv("DEFAULT_LANE_CONCURRENCY", "24")),
+        queue_size=int(os.getenv("DEFAULT_LANE_QUEUE", "100")),
+        max_wait=float(os.getenv("DEFAULT_LANE_MAX_WAIT", "5")),
+        retry_after=1,
+    ),
+}
+
+
+def lane_for(path: str):
+    """Pick the lane for a request path, or None if it bypasses admission."""
+    if path in EXEMPT_PATHS:
+        return None
+    if path.startswith(LLM_PATHS):
+        return LANES["llm"]
+    return LANES["default"]
+
+
+def _overloaded(lane: Lane) -> JSONResponse:
+    lane.shed += 1
+    return JSONResponse(
+        status_code=503,
+        content={"detail": "Server is busy. Please try again shortly."},
+        headers={"Retry-After": str(lane.retry_after)},
+    )
+
+
+class AdmissionMiddleware:
+    """Bounded, per-lane concurrency with queue-time limits and fast load shedding."""
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http" or scope["method"] == "OPTIONS":
+            await self.app(scope, receive, send)
+            return
+
+        lane = lane_for(scope["path"])
+        if lane is None:
+            await self.app(scope, receive, send)
+            return
+
+        if lane.semaphore.locked() and lane.waiting >= lane.queue_size:
+            await _overloaded(lane)(scope, receive, send)
+            return
+
+        lane.waiting += 1
+        started = time.perf_counter()
+        try:
+            await asyncio.wait_for(lane.semaphore.acquire(), timeout=lane.max_wait)
+        except asyncio.TimeoutError:
+            await _overloaded(lane)(scope, receive, send)
+            return
+        finally:
+            lane.waiting -= 1
+
+        waited_ms = (time.perf_counter() - started) * 1000
+        lane.admitted += 1
+        lane.total_wait_ms += waited_ms
+        lane.max_wait_ms = max(lane.max_wait_ms, waited_ms)
+
+        lane.active += 1
+        try:
+            await self.app(scope, receive, send)
+        finally:
+            lane.active -= 1
+            lane.semaphore.release()
+
+
+def get_admission_stats() -> dict:
+    return {name: lane.stats() for name, lane in LANES.items()}
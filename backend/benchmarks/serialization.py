@@ -0,0 +1,186 @@
+"""
+Payload size and serialization time for a large /api/experiences response.
+
+Without a database it compares the Python-side work only, on the same
+synthetic rows:
+  - before: tuple rows -> per-row dicts -> stdlib json (starlette's settings)
+  - after: json_agg's text, laid out the way Postgres prints it, wrapped
+    in an orjson Fragment as the endpoint does; building that text is
+    Postgres's work and is not timed here
+and reports identity size plus the size and time of the compression
+CompressionMiddleware applies (brotli and the gzip fallback).
+
+With DATABASE_URL set it also times the real endpoint queries end to end
+(query + fetch + serialization) against a scratch table it creates and
+drops, which is the number that answers "did the endpoint get faster":
+    python benchmarks/serialization.py
+    DATABASE_URL=postgresql://... python benchmarks/serialization.py
+"""
+import gzip
+import json
+import os
+import random
+import timeit
+import orjson
+
+try:
+    import brotli
+except ImportError:
+    brotli = None
+
+# Same levels as CompressionMiddleware (compression.py needs anyio, so they
+# are repeated here rather than imported)
+BROTLI_QUALITY = 4
+GZIP_LEVEL = 6
+
+NUM_ROWS = 100
+CONTENT_WORDS = 1200
+REPEAT = 50
+
+KEYS = ("id", "type", "title", "date_range", "skills", "industry", "tags", "content")
+
+WORDS = (
+    "built designed led scalable distributed service api latency reduced "
+    "python fastapi postgres react team users pipeline data model deployed "
+    "improved performance cloud aws docker kubernetes testing automated ci "
+    "migrated feature customers dashboard analytics machine learning search"
+).split()
+
+
+def make_rows():
+    rng = random.Random(0)
+    rows = []
+    for i in range(NUM_ROWS):
+        rows.append((
+            f"exp-{i:04d}",
+            rng.choice(["work", "project", "volunteering"]),
+            f"Software Engineer {i} at Company {i % 7}",
+            f"Jan 20{10 + i % 15} - Present",
+            rng.sample(WORDS, 8),
+            ["Software"],
+            [],
+            " ".join(rng.choice(WORDS) for _ in range(CONTENT_WORDS)),
+        ))
+    return rows
+
+
+def before(rows):
+    results = []
+    for row in rows:
+        results.append({
+            "id": row[0],
+            "type": row[1],
+            "title": row[2],
+            "date_range": row[3],
+            "skills": row[4],
+            "industry": row[5],
+            "tags": row[6],
+            "content": row[7]
+        })
+    # Same settings as starlette's JSONResponse.render
+    return json.dumps(
+        {"experiences": results, "count": len(results)},
+        ensure_ascii=False, allow_nan=False, indent=None, separators=(",", ":"),
+    ).encode("utf-8")
+
+
+def json_agg_text(rows):
+    """The text json_agg(json_build_object(...))::text returns for these rows."""
+    def value(v):
+        if isinstance(v, list):
+            return "[" + ",".join(json.dumps(x, ensure_ascii=False) for x in v) + "]"
+        return json.dumps(v, ensure_ascii=False)
+
+    objects = (
+        "{" + ", ".join(f'"{key}" : {value(v)}' for key, v in zip(KEYS, row)) + "}"
+        for row in rows
+    )
+    return "[" + ", \n ".join(objects) + "]"
+
+
+def after(experiences_json, count):
+    return orjson.dumps({"experiences": orjson.Fragment(experiences_json), "count": count})
+
+
+def best_ms(fn):
+    return min(timeit.repeat(fn, number=1, repeat=REPEAT)) * 1000
+
+
+def sizes(label, body):
+    print(f"  {label}")
+    print(f"    identity:  {len(body):>10,} bytes")
+    print(f"    gzip-{GZIP_LEVEL}:    {len(gzip.compress(body, GZIP_LEVEL)):>10,} bytes"
+          f"  ({best_ms(lambda: gzip.compress(body, GZIP_LEVEL)):.2f} ms)")
+    if brotli:
+        print(f"    br q{BROTLI_QUALITY}:     {len(brotli.compress(body, quality=BROTLI_QUALITY)):>10,} bytes"
+              f"  ({best_ms(lambda: brotli.compress(body, quality=BROTLI_QUALITY)):.2f} ms)")
+
+
+def offline(rows):
+    old_body = before(rows)
+    experiences_json = json_agg_text(rows)
+    new_body = after(experiences_json, len(rows))
+    print(f"{NUM_ROWS} rows, ~{len(old_body) // NUM_ROWS // 1024} KB each (Python side only)")
+    print(f"  before (dicts + json):       {best_ms(lambda: before(rows)):8.2f} ms")
+    print(f"  after (json_agg + Fragment): {best_ms(lambda: after(experiences_json, len(rows))):8.2f} ms")
+
+    sizes("before payload", old_body)
+    sizes("after payload", new_body)
+
+
+def end_to_end(rows, dsn):
+    import psycopg2
+
+    conn = psycopg2.connect(dsn)
+    cur = conn.cursor()
+    cur.execute("""
+        CREATE TEMP TABLE bench_experiences (
+            id TEXT, user_id TEXT, type TEXT, title TEXT, date_range TEXT,
+            skills TEXT[], industry TEXT[], tags TEXT[], content TEXT
+        )
+    """)
+    cur.executemany(
+        "INSERT INTO bench_experiences VALUES (%s, 'bench', %s, %s, %s, %s, %s, %s, %s)",
+        rows,
+    )
+
+    def old_endpoint():
+        cur.execute("""
+            SELECT id, type, title, date_range, skills, industry, tags, content
+            FROM bench_experiences WHERE user_id = 'bench' ORDER BY date_range DESC
+        """)
+        return before(cur.fetchall())
+
+    def new_endpoint():
+        cur.execute("""
+            SELECT coalesce(json_agg(json_build_object(
+                       'id', id, 'type', type, 'title', title, 'date_range', date_range,
+                       'skills', skills, 'industry', industry, 'tags', tags, 'content', content
+                   ) ORDER BY date_range DESC), '[]')::text,
+                   count(*)
+            FROM bench_experiences WHERE user_id = 'bench'
+        """)
+        return after(*cur.fetchone())
+
+    print("End to end (query + fetch + serialize):")
+    print(f"  before: {best_ms(old_endpoint):8.2f} ms")
+    print(f"  after:  {best_ms(new_endpoint):8.2f} ms")
+
+    cur.close()
+    conn.rollback()
+    conn.close()
+
+
+def main():
+    rows = make_rows()
+    offline(rows)
+
+    dsn = os.getenv("DATABASE_URL")
+    if dsn:
+        end_to_end(rows, dsn)
+    else:
+        print("DATABASE_URL not set; skipping the end-to-end query benchmark")
+
+
+if __name__ == "__main__":
+    main()
@@ -1,5 +1,9 @@
+import itertools
 import os
+import threading
+import time
 import psycopg2
+import psycopg2.extensions
 from pgvector.psycopg2 import register_vector
 
 # Use Supabase connection string from dashboard:
@@ -7,12 +11,137 @@ from pgvector.psycopg2 import register_vector
 # For production, use the "Connection pooling" string (port 6543)
 DATABASE_URL = os.getenv("DATABASE_URL")
 
+# Optional read replicas, comma-separated. Read-only endpoints are spread
+# across these; everything else goes to DATABASE_URL.
+DATABASE_READ_URLS = [
+    url.strip() for url in os.getenv("DATABASE_READ_URLS", "").split(",") if url.strip()
+]
 
-def get_db():
-    """Get a database connection with pgvector registered."""
-    if not DATABASE_URL:
-        raise RuntimeError("DATABASE_URL environment variable not set")
+# Reads from a user who wrote within this many seconds go to the primary,
+# so they see their own writes despite replica lag.
+READ_YOUR_WRITES_WINDOW = float(os.getenv("READ_YOUR_WRITES_WINDOW", "10"))
+# Once this many users are tracked, a write sweeps out expired entries so
+# users who write and never read again don't accumulate
+LAST_WRITE_SWEEP_SIZE = 1000
+
+_lock = threading.Lock()
+_replicas = itertools.cycle(range(len(DATABASE_READ_URLS)))
+_last_write = {}
+_stats = {}
+
+
+def _record(target: str, event: str, elapsed_ms: float = None, error: bool = False):
+    """Count a connect or query against a target, with its latency or failure."""
+    with _lock:
+        stats = _stats.setdefault(target, {
+            "connects": 0, "connect_errors": 0,
+            "queries": 0, "query_errors": 0, "total_ms": 0.0, "max_ms": 0.0,
+        })
+        # Attempts are counted whether or not they fail; errors are a subset
+        stats["connects" if event == "connect" else "queries"] += 1
+        if error:
+            stats[f"{event}_errors"] += 1
+        if elapsed_ms is not None:
+            stats["total_ms"] += elapsed_ms
+            stats["max_ms"] = max(stats["max_ms"], elapsed_ms)
+
+
+class TrackedCursor(psycopg2.extensions.cursor):
+    """Cursor that times each statement and counts failed ones per target."""
 
-    conn = psycopg2.connect(DATABASE_URL)
+    def execute(self, query, vars=None):
+        started = time.perf_counter()
+        failed = False
+        try:
+            return super().execute(query, vars)
+        except Exception:
+            failed = True
+            raise
+        finally:
+            elapsed_ms = (time.perf_counter() - started) * 1000
+            _record(self.connection.target, "query", elapsed_ms=elapsed_ms, error=failed)
+
+
+class TrackedConnection(psycopg2.extensions.connection):
+    """Connection that remembers which target it was opened against."""
+
+    target = "primary"
+
+
+def _connect(dsn: str, target: str):
+    try:
+        conn = psycopg2.connect(
+            dsn, connection_factory=TrackedConnection, cursor_factory=TrackedCursor
+        )
+    except psycopg2.Error:
+        _record(target, "connect", error=True)
+        raise
+    _record(target, "connect")
+    conn.target = target
     register_vector(conn)
     return conn
+
+
+def get_db(mode: str = "write", user_id: str = None):
+    """
+    Get a database connection with pgvector registered.
+
+    mode is "read" for endpoints that only run SELECTs and "write" for the
+    rest. Reads go to a replica when one is configured, unless user_id wrote
+    recently; writes always go to the primary and start that window.
+
+    Recent writes are tracked in memory, so read-your-writes only holds
+    within one process. With several uvicorn workers, a read that lands on
+    a different worker than the write can still hit a lagging replica.
+    """
+    if not DATABASE_URL:
+        raise RuntimeError("DATABASE_URL environment variable not set")
+
+    if mode == "write":
+        if user_id and DATABASE_READ_URLS:
+            now = time.monotonic()
+            with _lock:
+                if len(_last_write) >= LAST_WRITE_SWEEP_SIZE:
+                    expired = [
+                        uid for uid, wrote_at in _last_write.items()
+                        if now - wrote_at >= READ_YOUR_WRITES_WINDOW
+                    ]
+                    for uid in expired:
+                        del _last_write[uid]
+                _last_write[user_id] = now
+        return _connect(DATABASE_URL, "primary")
+
+    if not DATABASE_READ_URLS:
+        return _connect(DATABASE_URL, "primary")
+
+    with _lock:
+        wrote_at = _last_write.get(user_id)
+        if wrote_at is not None and time.monotonic() - wrote_at >= READ_YOUR_WRITES_WINDOW:
+            del _last_write[user_id]
+            wrote_at = None
+        replica = next(_replicas)
+
+    if wrote_at is not None:
+        return _connect(DATABASE_URL, "primary")
+
+    try:
+        return _connect(DATABASE_READ_URLS[replica], f"replica-{replica}")
+    except psycopg2.Error:
+        # A replica being down shouldn't take reads down with it
+        return _connect(DATABASE_URL, "primary")
+
+
+def get_db_stats() -> dict:
+    """Snapshot of per-target connect/query counts, errors and query latency."""
+    with _lock:
+        return {
+            target: {
+                "connects": stats["connects"],
+                "connect_errors": stats["connect_errors"],
+                "queries": stats["queries"],
+                "query_errors": stats["query_errors"],
+                "avg_query_ms": round(stats["total_ms"] / stats["queries"], 2) if stats["queries"] else 0.0,
+                "max_query_ms": round(stats["max_ms"], 2),
+            }
+            for target, stats in _stats.items()
+        }
@@ -1,6 +1,8 @@
 from dotenv import load_dotenv
 load_dotenv()  # Load .env before other imports
 
+from contextlib import asynccontextmanager
+from anyio import to_thread
 from fastapi import FastAPI, Request
 from fastapi.middleware.cors import CORSMiddleware
 from fastapi.responses import JSONResponse
@@ -8,10 +10,31 @@ from slowapi import Limiter
 from slowapi.util import get_remote_address
 from slowapi.errors import RateLimitExceeded
 from routes import experiences, search, generate, linkedin
+from database import DATABASE_URL, get_db_stats
+from responses import FastJSONResponse
+from compression import CompressionMiddleware
+from admission import THREADPOOL_SIZE, AdmissionMiddleware, get_admission_stats
+from utils import embedding_worker, tombstones
+from utils.llm import get_llm_stats
 
 limiter = Limiter(key_func=get_remote_address)
 
-app = FastAPI(title="Resume Tailor API")
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    to_thread.current_default_thread_limiter().total_tokens = THREADPOOL_SIZE
+    # Runs even with DEFER_EMBEDDINGS off so rows left pending still get filled
+    if DATABASE_URL:
+        embedding_worker.start()
+        tombstones.start()
+    yield
+
+
+app = FastAPI(
+    title="Resume Tailor API",
+    lifespan=lifespan,
+    default_response_class=FastJSONResponse,
+)
 app.state.limiter = limiter
 
 
@@ -22,6 +45,12 @@ async def rate_limit_handler(request: Request, exc: RateLimitExceeded):
         content={"detail": "Too many requests. Please wait a moment and try again."},
     )
 
+# Negotiates br, falling back to gzip for clients that don't accept it
+app.add_middleware(CompressionMiddleware)
+
+# Added before CORS so CORS stays outermost and 503s still carry its headers
+app.add_middleware(AdmissionMiddleware)
+
 app.add_middleware(
     CORSMiddleware,
     allow_origins=[
@@ -50,3 +79,12 @@ def root():
 @app.get("/health")
 def health():
     return {"status": "healthy"}
+
+
+@app.get("/metrics")
+def metrics():
+    return {
+        "database": get_db_stats(),
+        "admission": get_admission_stats(),
+        "llm": get_llm_stats(),
+    }
@@ -0,0 +1,14 @@
+-- Lets experiences be saved before their embedding exists.
+-- Rows written with DEFER_EMBEDDINGS=1 start as 'pending' and are filled in
+-- by the background worker in utils/embedding_worker.py.
+
+ALTER TABLE experiences ALTER COLUMN embedding DROP NOT NULL;
+
+ALTER TABLE experiences
+    ADD COLUMN IF NOT EXISTS embedding_status TEXT NOT NULL DEFAULT 'ready',
+    ADD COLUMN IF NOT EXISTS embedding_attempts INT NOT NULL DEFAULT 0,
+    ADD COLUMN IF NOT EXISTS embedding_next_attempt_at TIMESTAMPTZ NOT NULL DEFAULT now();
+
+CREATE INDEX IF NOT EXISTS experiences_pending_embedding_idx
+    ON experiences (embedding_next_attempt_at)
+    WHERE embedding_status IN ('pending', 'processing');
@@ -0,0 +1,25 @@
+-- Change feed for GET /api/experiences/changes (needs Postgres 13+).
+-- Each write stamps version with its transaction id. The feed only returns
+-- versions below the snapshot's xmin, i.e. from transactions that have all
+-- finished, so a transaction that started earlier but commits later can't
+-- slip in under a cursor a client already holds.
+-- Deletes become empty tombstones (deleted_at set) so clients can sync them;
+-- utils/tombstones.py removes them after the retention window and records
+-- the highest removed version per user in experience_purge_horizons.
+
+ALTER TABLE experiences
+    ADD COLUMN IF NOT EXISTS version BIGINT NOT NULL DEFAULT (pg_current_xact_id()::text::bigint),
+    ADD COLUMN IF NOT EXISTS deleted_at TIMESTAMPTZ;
+
+CREATE INDEX IF NOT EXISTS experiences_user_version_idx
+    ON experiences (user_id, version);
+
+CREATE INDEX IF NOT EXISTS experiences_tombstone_idx
+    ON experiences (deleted_at)
+    WHERE deleted_at IS NOT NULL;
+
+-- A client whose cursor is below its horizon may have missed purged deletes
+CREATE TABLE IF NOT EXISTS experience_purge_horizons (
+    user_id TEXT PRIMARY KEY,
+    version BIGINT NOT NULL
+);
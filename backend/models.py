@@ -1,10 +1,14 @@
 from pydantic import BaseModel, Field
-from typing import List, Optional
+from typing import List, Literal, Optional
 
 
 class SearchRequest(BaseModel):
     query: str = Field(..., min_length=1, max_length=5000)
     limit: int = Field(default=5, ge=1, le=20)
+    diversify: bool = False
+    mmr_lambda: float = Field(default=0.7, ge=0, le=1)
+    candidate_pool: int = Field(default=20, ge=1, le=100)
+    min_score: Optional[float] = Field(default=None, ge=-1, le=1)
 
 
 class ProjectData(BaseModel):
@@ -32,3 +36,4 @@ class LinkedInParseRequest(BaseModel):
 
 class BatchExperienceRequest(BaseModel):
     experiences: List[ProjectData] = Field(..., max_length=25)
+    on_duplicate: Literal["flag", "merge", "skip"] = "flag"
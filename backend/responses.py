@@ -0,0 +1,14 @@
+import orjson
+from fastapi.responses import JSONResponse
+
+# Compress responses at least this big; smaller ones cost more to compress
+# than they save on the wire
+COMPRESSION_MINIMUM_SIZE = 1024
+
+
+class FastJSONResponse(JSONResponse):
+    """JSONResponse rendered with orjson instead of the stdlib encoder."""
+
+    def render(self, content) -> bytes:
+        return orjson.dumps(content, option=orjson.OPT_NON_STR_KEYS)
+
@@ -1,7 +1,11 @@
+import orjson
 from fastapi import APIRouter, HTTPException, Depends, Request
 from models import ProjectData, BatchExperienceRequest
 from database import get_db
+from responses import FastJSONResponse
 from utils.embeddings import get_embedding, get_embeddings_batch
+from utils.ranking import find_near_duplicates, resolve_duplicate_chains
+from utils import embedding_worker
 from dependencies.auth import get_current_user
 from slowapi import Limiter
 from slowapi.util import get_remote_address
@@ -10,6 +14,14 @@ limiter = Limiter(key_func=get_remote_address)
 
 router = APIRouter(prefix="/api", tags=["experiences"])
 
+DUPLICATE_THRESHOLD = 0.95
+MERGED_FIELDS = ("skills", "industry", "tags")
+
+
+def _merge_lists(current, extra):
+    """Union two lists, keeping first-seen order."""
+    return list(dict.fromkeys((current or []) + (extra or [])))
+
 
 @router.post("/experiences")
 @limiter.limit("15/minute")
@@ -18,14 +30,38 @@ def add_experience(
     request: Request,
     user_id: str = Depends(get_current_user),
 ):
-    embedding = get_embedding(project.content)
-    conn = get_db()
+    deferred = embedding_worker.DEFER_EMBEDDINGS
+    embedding = None if deferred else get_embedding(project.content)
+    conn = get_db("write", user_id)
     cur = conn.cursor()
 
     try:
+        # Single saves (e.g. one parsed LinkedIn entry at a time) get the same
+        # check as batch imports, but only flag: the row is always inserted.
+        # Deferred saves have no vector yet, so there is nothing to compare.
+        duplicates = []
+        if embedding is not None:
+            # One vector only needs its nearest neighbour, which the HNSW
+            # index finds without pulling the user's vectors into Python
+            cur.execute("""
+                SELECT id, 1 - (embedding <=> %s::vector)
+                FROM experiences
+                WHERE user_id = %s AND embedding IS NOT NULL AND deleted_at IS NULL
+                ORDER BY embedding <=> %s::vector
+                LIMIT 1
+            """, (embedding, user_id, embedding))
+            nearest = cur.fetchone()
+            if nearest and nearest[1] >= DUPLICATE_THRESHOLD:
+                duplicates.append({
+                    "id": project.id,
+                    "duplicate_of": nearest[0],
+                    "similarity": round(float(nearest[1]), 4),
+                    "action": "flagged",
+                })
+
         cur.execute("""
-        INSERT INTO experiences (id, user_id, type, title, date_range, skills, industry, tags, content, embedding)
-        VALUES (%s, %s, %s, %s, %s, %s, %s, %s, %s, %s)
+        INSERT INTO experiences (id, user_id, type, title, date_range, skills, industry, tags, content, embedding, embedding_status)
+        VALUES (%s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s)
         """, (
             project.id,
             user_id,
@@ -36,10 +72,18 @@ def add_experience(
             project.industry,
             project.tags,
             project.content,
-            embedding
+            embedding,
+            "pending" if deferred else "ready"
         ))
         conn.commit()
-        return {"status": "success", "id": project.id}
+        if deferred:
+            embedding_worker.notify()
+        return {
+            "status": "success",
+            "id": project.id,
+            "embedding_status": "pending" if deferred else "ready",
+            "duplicates": duplicates,
+        }
     except Exception as e:
         conn.rollback()
         raise HTTPException(status_code=500, detail="An error occurred while processing your request")
@@ -61,11 +105,57 @@ def add_experiences_batch(
     texts = [exp.content for exp in body.experiences]
     embeddings = get_embeddings_batch(texts)
 
-    conn = get_db()
+    conn = get_db("write", user_id)
     cur = conn.cursor()
 
     try:
-        for exp, embedding in zip(body.experiences, embeddings):
+        cur.execute("""
+            SELECT id, skills, industry, tags, embedding
+            FROM experiences
+            WHERE user_id = %s AND embedding IS NOT NULL AND deleted_at IS NULL
+        """, (user_id,))
+        existing = cur.fetchall()
+
+        matches = resolve_duplicate_chains(
+            find_near_duplicates(embeddings, [row[4] for row in existing], DUPLICATE_THRESHOLD),
+            body.on_duplicate,
+        )
+
+        # Decide what happens to each entry before writing anything, so merges
+        # into earlier batch entries land before those entries are inserted
+        keep = []
+        duplicates = []
+        merged_existing = {}
+        for i, exp in enumerate(body.experiences):
+            match = matches[i]
+            if not match:
+                keep.append(i)
+                continue
+
+            source, index, similarity = match
+            duplicates.append({
+                "id": exp.id,
+                "duplicate_of": existing[index][0] if source == "existing" else body.experiences[index].id,
+                "similarity": round(similarity, 4),
+                "action": {"flag": "flagged", "merge": "merged", "skip": "skipped"}[body.on_duplicate],
+            })
+
+            if body.on_duplicate == "flag":
+                keep.append(i)
+            elif body.on_duplicate == "merge":
+                if source == "existing":
+                    target = merged_existing.setdefault(index, {
+                        field: existing[index][pos + 1] for pos, field in enumerate(MERGED_FIELDS)
+                    })
+                    for field in MERGED_FIELDS:
+                        target[field] = _merge_lists(target[field], getattr(exp, field))
+                else:
+                    target = body.experiences[index]
+                    for field in MERGED_FIELDS:
+                        setattr(target, field, _merge_lists(getattr(target, field), getattr(exp, field)))
+
+        for i in keep:
+            exp = body.experiences[i]
             cur.execute("""
             INSERT INTO experiences (id, user_id, type, title, date_range, skills, industry, tags, content, embedding)
             VALUES (%s, %s, %s, %s, %s, %s, %s, %s, %s, %s)
@@ -79,10 +169,25 @@ def add_experiences_batch(
                 exp.industry,
                 exp.tags,
                 exp.content,
-                embedding
+                embeddings[i]
             ))
+
+        for index, fields in merged_existing.items():
+            cur.execute("""
+                UPDATE experiences
+                SET skills = %s, industry = %s, tags = %s,
+                    version = pg_current_xact_id()::text::bigint
+                WHERE id = %s AND user_id = %s
+            """, (
+                fields["skills"],
+                fields["industry"],
+                fields["tags"],
+                existing[index][0],
+                user_id
+            ))
+
         conn.commit()
-        return {"status": "success", "count": len(body.experiences)}
+        return {"status": "success", "count": len(keep), "duplicates": duplicates}
     except Exception as e:
         conn.rollback()
         raise HTTPException(status_code=500, detail="An error occurred while processing your request")
@@ -93,33 +198,101 @@ def add_experiences_batch(
 
 @router.get("/experiences")
 def get_all_experiences(user_id: str = Depends(get_current_user)):
-    conn = get_db()
+    conn = get_db("read", user_id)
+    cur = conn.cursor()
+
+    try:
+        # Postgres builds the JSON array itself, so large libraries skip the
+        # per-row dict construction and re-encoding in Python. The cursor is
+        # taken from the same snapshot, for /experiences/changes to continue from.
+        cur.execute("""
+             SELECT coalesce(json_agg(json_build_object(
+                        'id', id, 'type', type, 'title', title, 'date_range', date_range,
+                        'skills', skills, 'industry', industry, 'tags', tags, 'content', content
+                    ) ORDER BY date_range DESC), '[]')::text,
+                    count(*),
+                    pg_snapshot_xmin(pg_current_snapshot())::text::bigint - 1
+             FROM experiences
+             WHERE user_id = %s AND deleted_at IS NULL
+        """, (user_id,))
+
+        experiences_json, count, cursor = cur.fetchone()
+    finally:
+        cur.close()
+        conn.close()
+
+    return FastJSONResponse({
+        "experiences": orjson.Fragment(experiences_json),
+        "count": count,
+        "cursor": cursor,
+    })
+
+
+@router.get("/experiences/changes")
+def get_experience_changes(
+    since: int = 0,
+    user_id: str = Depends(get_current_user),
+):
+    """
+    Rows changed after `since`, for clients that keep a local copy.
+
+    Pass the returned cursor (an integer) as `since` on the next call.
+    Deleted experiences come back as ids in `deleted`. Tombstones are kept
+    for TOMBSTONE_RETENTION_DAYS; if some deletes after `since` have already
+    been purged, this returns 410 and the client must reload the full list.
+    """
+    # Always read from the primary: the cursor comes from its snapshot
+    conn = get_db("write")
     cur = conn.cursor()
 
-    cur.execute("""
-         SELECT id, type, title, date_range, skills, industry, tags, content
-         FROM experiences
-         WHERE user_id = %s
-         ORDER BY date_range DESC
-    """, (user_id,))
+    try:
+        # Only versions below the snapshot's xmin are returned. Every
+        # transaction under it has finished, so nothing can later commit
+        # with a version at or below the cursor handed out here.
+        cur.execute("SELECT pg_snapshot_xmin(pg_current_snapshot())::text::bigint")
+        xmin = cur.fetchone()[0]
 
-    results = []
-    for row in cur.fetchall():
-        results.append({
-            "id": row[0],
-            "type": row[1],
-            "title": row[2],
-            "date_range": row[3],
-            "skills": row[4],
-            "industry": row[5],
-            "tags": row[6],
-            "content": row[7]
-        })
+        if since > 0:
+            cur.execute(
+                "SELECT version FROM experience_purge_horizons WHERE user_id = %s",
+                (user_id,)
+            )
+            horizon = cur.fetchone()
+            if horizon and since < horizon[0]:
+                raise HTTPException(
+                    status_code=410,
+                    detail="Sync cursor has expired. Reload all experiences."
+                )
 
-    cur.close()
-    conn.close()
+        cur.execute("""
+             SELECT id, type, title, date_range, skills, industry, tags, content, deleted_at
+             FROM experiences
+             WHERE user_id = %s AND version > %s AND version < %s
+             ORDER BY version
+        """, (user_id, since, xmin))
 
-    return {"experiences": results, "count": len(results)}
+        changed = []
+        deleted = []
+        for row in cur.fetchall():
+            if row[8] is not None:
+                deleted.append(row[0])
+            else:
+                changed.append({
+                    "id": row[0],
+                    "type": row[1],
+                    "title": row[2],
+                    "date_range": row[3],
+                    "skills": row[4],
+                    "industry": row[5],
+                    "tags": row[6],
+                    "content": row[7]
+                })
+        cursor = max(since, xmin - 1)
+    finally:
+        cur.close()
+        conn.close()
+
+    return {"experiences": changed, "deleted": deleted, "cursor": cursor}
 
 
 @router.put("/experiences/{experience_id}")
@@ -130,16 +303,20 @@ def update_experience(
     request: Request,
     user_id: str = Depends(get_current_user),
 ):
-    embedding = get_embedding(project.content)
-    conn = get_db()
+    deferred = embedding_worker.DEFER_EMBEDDINGS
+    embedding = None if deferred else get_embedding(project.content)
+    conn = get_db("write", user_id)
     cur = conn.cursor()
 
     try:
         cur.execute("""
             UPDATE experiences
             SET type = %s, title = %s, date_range = %s, skills = %s,
-                industry = %s, tags = %s, content = %s, embedding = %s
-            WHERE id = %s AND user_id = %s
+                industry = %s, tags = %s, content = %s, embedding = %s,
+                embedding_status = %s, embedding_attempts = 0,
+                embedding_next_attempt_at = now(),
+                version = pg_current_xact_id()::text::bigint
+            WHERE id = %s AND user_id = %s AND deleted_at IS NULL
         """, (
             project.type,
             project.title,
@@ -149,6 +326,7 @@ def update_experience(
             project.tags,
             project.content,
             embedding,
+            "pending" if deferred else "ready",
             experience_id,
             user_id
         ))
@@ -157,7 +335,13 @@ def update_experience(
             raise HTTPException(status_code=404, detail="Experience not found")
 
         conn.commit()
-        return {"status": "updated", "id": experience_id}
+        if deferred:
+            embedding_worker.notify()
+        return {
+            "status": "updated",
+            "id": experience_id,
+            "embedding_status": "pending" if deferred else "ready",
+        }
     except HTTPException:
         raise
     except Exception as e:
@@ -175,17 +359,26 @@ def delete_experience(
     request: Request,
     user_id: str = Depends(get_current_user),
 ):
-    conn = get_db()
+    conn = get_db("write", user_id)
     cur = conn.cursor()
-    cur.execute(
-        "DELETE FROM experiences WHERE id = %s AND user_id = %s",
-        (experience_id, user_id)
-    )
-    deleted = cur.rowcount
-
-    conn.commit()
-    cur.close()
-    conn.close()
+
+    try:
+        # Keep an empty tombstone so the change feed can report the delete;
+        # the user's data itself is cleared now and the row is purged later
+        cur.execute("""
+            UPDATE experiences
+            SET deleted_at = now(),
+                version = pg_current_xact_id()::text::bigint,
+                title = '', date_range = NULL, skills = '{}', industry = '{}',
+                tags = '{}', content = '', embedding = NULL
+            WHERE id = %s AND user_id = %s AND deleted_at IS NULL
+        """, (experience_id, user_id))
+        deleted = cur.rowcount
+
+        conn.commit()
+    finally:
+        cur.close()
+        conn.close()
 
     if deleted == 0:
         raise HTTPException(status_code=404, detail="Experience not found")
@@ -1,7 +1,8 @@
 from fastapi import APIRouter, HTTPException, Depends, Request
 from models import GenerateRequest
 from database import get_db
-from utils.llm import call_llm, parse_bullets
+from responses import FastJSONResponse
+from utils.llm import route_llm, parse_bullets
 from dependencies.auth import get_current_user
 from slowapi import Limiter
 from slowapi.util import get_remote_address
@@ -24,21 +25,22 @@ def generate_bullets(
             detail="Please select at least one experience to generate bullets from."
         )
 
-    conn = get_db()
+    conn = get_db("read", user_id)
     cur = conn.cursor()
 
-    # Fetch selected experiences
-    placeholders = ','.join(['%s'] * len(body.experience_ids))
-    cur.execute(f"""
-        SELECT title, content, skills
-        FROM experiences
-        WHERE id IN ({placeholders}) AND user_id = %s
-    """, (*body.experience_ids, user_id))
+    try:
+        # Fetch selected experiences
+        placeholders = ','.join(['%s'] * len(body.experience_ids))
+        cur.execute(f"""
+            SELECT title, content, skills
+            FROM experiences
+            WHERE id IN ({placeholders}) AND user_id = %s AND deleted_at IS NULL
+        """, (*body.experience_ids, user_id))
 
-    rows = cur.fetchall()
-
-    cur.close()
-    conn.close()
+        rows = cur.fetchall()
+    finally:
+        cur.close()
+        conn.close()
 
     if not rows:
         raise HTTPException(status_code=404, detail="No experiences found")
@@ -71,7 +73,7 @@ Generate 3 bullet points that:
 
 Return ONLY the 3 bullet points, one per line, each starting with •"""
 
-        llm_output = call_llm(prompt)
+        llm_output = route_llm("bullets", prompt)
         bullets = parse_bullets(llm_output, 3)
 
         projects.append({
@@ -79,4 +81,4 @@ Return ONLY the 3 bullet points, one per line, each starting with •"""
             "bullets": bullets
         })
 
-    return {"projects": projects}
+    return FastJSONResponse({"projects": projects})
@@ -1,7 +1,7 @@
 import json
 from fastapi import APIRouter, HTTPException, Depends, Request
 from models import LinkedInParseRequest
-from utils.llm import call_llm
+from utils.llm import INVALID_OUTPUT_STATUS, route_llm
 from dependencies.auth import get_current_user
 from slowapi import Limiter
 from slowapi.util import get_remote_address
@@ -11,6 +11,29 @@ limiter = Limiter(key_func=get_remote_address)
 router = APIRouter(prefix="/api", tags=["linkedin"])
 
 
+def _extract_json(llm_output: str):
+    """Parse the JSON array out of an LLM response, tolerating markdown fences."""
+    text = llm_output.strip()
+    # Handle cases where LLM wraps JSON in markdown code blocks
+    if text.startswith("```"):
+        text = text.split("\n", 1)[1] if "\n" in text else text[3:]
+        text = text.rsplit("```", 1)[0]
+        text = text.strip()
+
+    parsed = json.loads(text)
+    if not isinstance(parsed, list):
+        parsed = [parsed]
+    return parsed
+
+
+def _is_valid_json(llm_output: str) -> bool:
+    try:
+        _extract_json(llm_output)
+        return True
+    except json.JSONDecodeError:
+        return False
+
+
 @router.post("/parse-linkedin")
 @limiter.limit("5/minute")
 def parse_linkedin(
@@ -55,22 +78,14 @@ Rules:
 
 Return ONLY the JSON array:"""
 
-    llm_output = call_llm(prompt, temperature=0.1)
-
-    # Parse the JSON response
+    # A model that returns unparseable JSON counts as failed, so the router
+    # falls back to the next one instead of surfacing the error
     try:
-        # Try to extract JSON array from the response
-        text = llm_output.strip()
-        # Handle cases where LLM wraps JSON in markdown code blocks
-        if text.startswith("```"):
-            text = text.split("\n", 1)[1] if "\n" in text else text[3:]
-            text = text.rsplit("```", 1)[0]
-            text = text.strip()
-
-        parsed = json.loads(text)
-        if not isinstance(parsed, list):
-            parsed = [parsed]
-    except json.JSONDecodeError:
+        llm_output = route_llm("extract", prompt, temperature=0.1, validate=_is_valid_json)
+        parsed = _extract_json(llm_output)
+    except HTTPException as e:
+        if e.status_code != INVALID_OUTPUT_STATUS:
+            raise
         raise HTTPException(
             status_code=500,
             detail="Failed to parse LinkedIn text. Please try again or adjust the pasted text."
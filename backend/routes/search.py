@@ -1,7 +1,9 @@
 from fastapi import APIRouter, Depends, Request
 from models import SearchRequest
 from database import get_db
+from responses import FastJSONResponse
 from utils.embeddings import get_embedding
+from utils.ranking import mmr_rerank
 from dependencies.auth import get_current_user
 from slowapi import Limiter
 from slowapi.util import get_remote_address
@@ -22,35 +24,69 @@ def search_experiences(
 ):
     query_embedding = get_embedding(body.query, input_type="search_query")
 
-    conn = get_db()
+    conn = get_db("read", user_id)
     cur = conn.cursor()
 
-    cur.execute("""
-        SELECT id, type, title, date_range, content, skills
-        FROM experiences
-        WHERE user_id = %s
-        ORDER BY embedding <=> %s::vector
-        LIMIT 3
-    """, (user_id, query_embedding))
+    try:
+        threshold = body.min_score if body.min_score is not None else SIMILARITY_THRESHOLD
+        # Over-fetch when diversifying so MMR has near-duplicates to skip past
+        fetch_limit = max(body.candidate_pool, body.limit) if body.diversify else body.limit
+        # Vectors are only needed for MMR's candidate-to-candidate similarity
+        extra_columns = ", embedding" if body.diversify else ""
+
+        cur.execute(f"""
+            SELECT id, type, title, date_range, content, skills,
+                   1 - (embedding <=> %s::vector) AS score{extra_columns}
+            FROM experiences
+            WHERE user_id = %s AND embedding_status = 'ready' AND deleted_at IS NULL
+            ORDER BY embedding <=> %s::vector
+            LIMIT %s
+        """, (query_embedding, user_id, query_embedding, fetch_limit))
+
+        rows = [row for row in cur.fetchall() if row[6] >= threshold]
+
+        # Rows saved with deferred embedding can't be ranked yet; report them
+        # instead of silently leaving them out. 'pending' and 'processing' are
+        # the only other states, and the worker retries both until they're ready
+        cur.execute("""
+            SELECT count(*)
+            FROM experiences
+            WHERE user_id = %s AND embedding_status <> 'ready' AND deleted_at IS NULL
+        """, (user_id,))
+        pending = cur.fetchone()[0]
+    finally:
+        cur.close()
+        conn.close()
+
+    if body.diversify and rows:
+        order = mmr_rerank(
+            [row[6] for row in rows],
+            [row[7] for row in rows],
+            k=body.limit,
+            lambda_mult=body.mmr_lambda,
+        )
+        rows = [rows[i] for i in order]
+    else:
+        rows = rows[:body.limit]
 
     results = []
-    for row in cur.fetchall():
+    for row in rows:
         results.append({
             "id": row[0],
             "type": row[1],
             "title": row[2],
             "date_range": row[3],
             "content": row[4],
-            "skills": row[5]
+            "skills": row[5],
+            "score": round(float(row[6]), 4)
         })
 
-    cur.close()
-    conn.close()
-
     if not results:
-        return {
+        return FastJSONResponse({
             "results": [],
+            "pending": pending,
             "message": "No experiences found matching your query. Try broader search terms."
-        }
+        })
 
-    return {"results": results}
+    # Returned directly so the rows skip jsonable_encoder on the way out
+    return FastJSONResponse({"results": results, "pending": pending})
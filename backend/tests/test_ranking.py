@@ -0,0 +1,100 @@
+import numpy as np
+
+from utils.ranking import (
+    cosine_matrix,
+    find_near_duplicates,
+    mmr_rerank,
+    resolve_duplicate_chains,
+)
+
+
+def test_cosine_matrix_handles_zero_vectors():
+    sims = cosine_matrix([[1, 0], [0, 0]], [[1, 0]])
+    assert sims[0, 0] == 1.0
+    assert sims[1, 0] == 0.0
+
+
+def test_mmr_skips_identical_vectors():
+    embeddings = [[1, 0, 0], [1, 0, 0], [1, 0, 0], [0, 1, 0]]
+    scores = [0.9, 0.9, 0.9, 0.5]
+
+    order = mmr_rerank(scores, embeddings, k=2, lambda_mult=0.5)
+
+    # Ties go to the lowest index, then the distinct vector beats the copies
+    assert order == [0, 3]
+
+
+def test_mmr_identical_vectors_are_each_returned_once():
+    embeddings = np.ones((4, 3))
+    order = mmr_rerank([0.5, 0.7, 0.7, 0.6], embeddings, k=4)
+
+    assert order[0] == 1
+    assert sorted(order) == [0, 1, 2, 3]
+
+
+def test_mmr_lambda_one_is_plain_relevance_order():
+    embeddings = [[1, 0], [1, 0.01], [0, 1]]
+    assert mmr_rerank([0.9, 0.8, 0.1], embeddings, k=3, lambda_mult=1.0) == [0, 1, 2]
+
+
+def test_mmr_single_candidate():
+    assert mmr_rerank([0.3], [[0.2, 0.4]], k=5) == [0]
+
+
+def test_mmr_k_larger_than_candidates():
+    order = mmr_rerank([0.1, 0.9, 0.5], [[1, 0], [0, 1], [1, 1]], k=10)
+    assert sorted(order) == [0, 1, 2]
+    assert order[0] == 1
+
+
+def test_mmr_empty_and_zero_k():
+    assert mmr_rerank([], np.empty((0, 3)), k=3) == []
+    assert mmr_rerank([0.5], [[1, 0]], k=0) == []
+
+
+def test_near_duplicates_existing_wins_over_batch():
+    new = [[1, 0, 0], [1, 0, 0]]
+    existing = [[0, 1, 0], [1, 0.001, 0]]
+
+    matches = find_near_duplicates(new, existing, threshold=0.95)
+
+    assert matches[0][:2] == ("existing", 1)
+    # Also an exact copy of new[0], but the existing row takes precedence
+    assert matches[1][:2] == ("existing", 1)
+
+
+def test_near_duplicates_batch_points_at_earlier_entry():
+    new = [[1, 0], [0, 1], [1, 0.001]]
+
+    matches = find_near_duplicates(new, np.empty((0, 2)), threshold=0.95)
+
+    assert matches[0] is None
+    assert matches[1] is None
+    assert matches[2][:2] == ("batch", 0)
+
+
+def test_near_duplicates_below_threshold():
+    matches = find_near_duplicates([[1, 0]], [[0.8, 0.6]], threshold=0.95)
+    assert matches == [None]
+
+
+def test_chain_resolution_repoints_to_dropped_entrys_match():
+    # new[1] copies new[0], which copies existing row 3
+    matches = [("existing", 3, 0.97), ("batch", 0, 0.99), None, ("batch", 2, 0.96)]
+
+    for mode in ("skip", "merge"):
+        resolved = resolve_duplicate_chains(matches, mode)
+        assert resolved[1] == ("existing", 3, 0.99)
+        # new[2] is kept, so a match on it stays a batch match
+        assert resolved[3] == ("batch", 2, 0.96)
+
+
+def test_chain_resolution_follows_multi_step_chains():
+    matches = [("existing", 0, 0.97), ("batch", 0, 0.98), ("batch", 1, 0.99)]
+    resolved = resolve_duplicate_chains(matches, "skip")
+    assert resolved[2] == ("existing", 0, 0.99)
+
+
+def test_chain_resolution_flag_keeps_batch_matches():
+    matches = [("existing", 3, 0.97), ("batch", 0, 0.99)]
+    assert resolve_duplicate_chains(matches, "flag") == matches
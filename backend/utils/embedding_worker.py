@@ -0,0 +1,134 @@
+import logging
+import os
+import threading
+from database import get_db
+from utils.embeddings import get_embeddings_batch
+
+logger = logging.getLogger(__name__)
+
+# Opt-in: when set, add/update store the row as 'pending' and return without
+# waiting on Cohere; this worker fills the embedding in afterwards.
+DEFER_EMBEDDINGS = os.getenv("DEFER_EMBEDDINGS", "").lower() in ("1", "true", "yes")
+
+BATCH_SIZE = 32
+POLL_INTERVAL = 30
+RETRY_BASE_SECONDS = 10
+# Failed rows keep retrying forever, just no more often than this, so a long
+# Cohere outage delays embeddings instead of stranding them
+RETRY_MAX_SECONDS = 600
+# A claimed row whose worker died is picked up again after this long
+CLAIM_TIMEOUT_SECONDS = 120
+
+_wake = threading.Event()
+_started = False
+
+
+def notify():
+    """Wake the worker so newly written pending rows are picked up right away."""
+    _wake.set()
+
+
+def _claim(batch_size: int) -> list:
+    """Mark a batch of due rows as 'processing' and commit, releasing the locks."""
+    conn = get_db("write")
+    cur = conn.cursor()
+
+    try:
+        # SKIP LOCKED lets several app processes share the queue; expired
+        # 'processing' claims are included so a crashed worker's rows recover
+        cur.execute("""
+            UPDATE experiences
+            SET embedding_status = 'processing',
+                embedding_next_attempt_at = now() + make_interval(secs => %s)
+            WHERE id IN (
+                SELECT id
+                FROM experiences
+                WHERE embedding_status IN ('pending', 'processing')
+                  AND embedding_next_attempt_at <= now()
+                  AND deleted_at IS NULL
+                ORDER BY embedding_next_attempt_at
+                LIMIT %s
+                FOR UPDATE SKIP LOCKED
+            )
+            RETURNING id, content, md5(content)
+        """, (CLAIM_TIMEOUT_SECONDS, batch_size))
+        rows = cur.fetchall()
+        conn.commit()
+        return rows
+    except Exception:
+        conn.rollback()
+        raise
+    finally:
+        cur.close()
+        conn.close()
+
+
+def process_pending() -> int:
+    """Embed one batch of pending rows. Returns the number of rows claimed."""
+    rows = _claim(BATCH_SIZE)
+    if not rows:
+        return 0
+
+    # Cohere is called outside any transaction, so edits and deletes on these
+    # rows never wait on it
+    try:
+        embeddings = get_embeddings_batch([row[1] for row in rows])
+    except Exception as e:
+        logger.warning("Embedding %d pending rows failed: %s", len(rows), e)
+        embeddings = None
+
+    conn = get_db("write")
+    cur = conn.cursor()
+
+    try:
+        if embeddings is None:
+            cur.execute("""
+                UPDATE experiences
+                SET embedding_status = 'pending',
+                    embedding_attempts = embedding_attempts + 1,
+                    embedding_next_attempt_at = now() + make_interval(
+                        secs => least(%s, %s * power(2, embedding_attempts))
+                    )
+                WHERE id = ANY(%s) AND embedding_status = 'processing'
+            """, (RETRY_MAX_SECONDS, RETRY_BASE_SECONDS, [row[0] for row in rows]))
+        else:
+            # Only write back if the row wasn't edited while we were embedding;
+            # an edit resets it to 'pending' and it gets embedded again
+            for row, embedding in zip(rows, embeddings):
+                cur.execute("""
+                    UPDATE experiences
+                    SET embedding = %s, embedding_status = 'ready', embedding_attempts = 0
+                    WHERE id = %s AND embedding_status = 'processing' AND md5(content) = %s
+                """, (embedding, row[0], row[2]))
+        conn.commit()
+        return len(rows)
+    except Exception:
+        conn.rollback()
+        raise
+    finally:
+        cur.close()
+        conn.close()
+
+
+def _run():
+    while True:
+        # Clear before draining, so a notify() that arrives mid-drain leaves
+        # the event set and the next wait returns straight away
+        _wake.clear()
+        try:
+            # Keep draining while full batches come back
+            while process_pending() == BATCH_SIZE:
+                pass
+        except Exception as e:
+            logger.error("Embedding worker error: %s", e)
+
+        _wake.wait(POLL_INTERVAL)
+
+
+def start():
+    """Start the background embedding thread once per process."""
+    global _started
+    if _started:
+        return
+    _started = True
+    threading.Thread(target=_run, name="embedding-worker", daemon=True).start()
@@ -1,10 +1,47 @@
 import os
+import threading
+import time
 import requests
+from concurrent.futures import ThreadPoolExecutor, FIRST_COMPLETED, wait
 from fastapi import HTTPException
 
 GROQ_API_KEY = os.getenv("GROQ_API_KEY")
 GROQ_API_URL = "https://api.groq.com/openai/v1/chat/completions"
 
+# Models to try per task, in preference order. Override with a
+# comma-separated LLM_MODELS_<TASK> env var.
+MODEL_ROUTES = {
+    task: [m.strip() for m in os.getenv(f"LLM_MODELS_{task.upper()}", default).split(",") if m.strip()]
+    for task, default in {
+        "default": "llama-3.1-8b-instant,llama-3.3-70b-versatile",
+        "bullets": "llama-3.1-8b-instant,llama-3.3-70b-versatile",
+        "extract": "llama-3.3-70b-versatile,llama-3.1-8b-instant",
+    }.items()
+}
+
+# Statuses from call_llm that mean "this model is busy", not "this request is bad"
+FALLBACK_STATUSES = (429, 504)
+# Raised by _timed_call when validate rejects a model's answer
+INVALID_OUTPUT_STATUS = 422
+ROUTE_TIMEOUT = 30
+COOLDOWN_SECONDS = 30
+EWMA_ALPHA = 0.2
+# A model over either limit is demoted behind healthy ones in its task list
+SLOW_LATENCY_MS = 8000
+HIGH_ERROR_RATE = 0.5
+LLM_SPECULATIVE = os.getenv("LLM_SPECULATIVE", "").lower() in ("1", "true", "yes")
+# Every request the LLM admission lane lets in can race two models at once,
+# so keep this at least 2x LLM_LANE_CONCURRENCY (8 by default); a smaller pool
+# queues the racers and makes tail latency worse. The losing call is not
+# cancelled: it runs to completion and still spends Groq quota.
+LLM_SPECULATIVE_WORKERS = int(os.getenv("LLM_SPECULATIVE_WORKERS", "16"))
+
+_stats_lock = threading.Lock()
+_model_stats = {}
+_speculative_pool = ThreadPoolExecutor(
+    max_workers=LLM_SPECULATIVE_WORKERS, thread_name_prefix="llm-speculative"
+)
+
 
 def call_llm(prompt: str, model: str = "llama-3.1-8b-instant", temperature: float = 0.3, timeout: int = 60) -> str:
     """Call Groq API and return the response text."""
@@ -63,3 +100,125 @@ def parse_bullets(llm_output: str, max_bullets: int) -> list:
             bullets = [cleaned]
 
     return bullets[:max_bullets]
+
+
+def _record(model: str, elapsed: float, error_status: int = None):
+    with _stats_lock:
+        stats = _model_stats.setdefault(model, {
+            "calls": 0, "errors": 0, "latency_ms": None, "error_rate": 0.0, "cooldown_until": 0.0,
+        })
+        stats["calls"] += 1
+        # Only successes feed latency: a 429 that comes back in 50 ms would
+        # otherwise make a rate-limited model look fast
+        if error_status is None:
+            latency_ms = elapsed * 1000
+            if stats["latency_ms"] is None:
+                stats["latency_ms"] = latency_ms
+            else:
+                stats["latency_ms"] += EWMA_ALPHA * (latency_ms - stats["latency_ms"])
+
+        failed = 1.0 if error_status is not None else 0.0
+        stats["error_rate"] += EWMA_ALPHA * (failed - stats["error_rate"])
+        if error_status is not None:
+            stats["errors"] += 1
+        if error_status in FALLBACK_STATUSES:
+            stats["cooldown_until"] = time.monotonic() + COOLDOWN_SECONDS
+
+
+def _ordered_models(task: str) -> list:
+    """
+    Task models ordered by health, then preference.
+
+    Healthy models keep their configured order. Models whose moving-average
+    latency or error rate is over the limit come next, fastest first, and
+    models cooling down after a 429 or timeout go last.
+    """
+    models = MODEL_ROUTES.get(task) or MODEL_ROUTES["default"]
+    now = time.monotonic()
+
+    with _stats_lock:
+        def rank(item):
+            index, model = item
+            stats = _model_stats.get(model)
+            if stats is None:
+                return (0, 0, index)
+            cooling = stats["cooldown_until"] > now
+            latency = stats["latency_ms"] or 0.0
+            degraded = latency > SLOW_LATENCY_MS or stats["error_rate"] > HIGH_ERROR_RATE
+            return (cooling, degraded, latency if degraded else index)
+
+        return [model for _, model in sorted(enumerate(models), key=rank)]
+
+
+def _timed_call(model: str, prompt: str, temperature: float, validate) -> str:
+    started = time.perf_counter()
+    try:
+        output = call_llm(prompt, model=model, temperature=temperature, timeout=ROUTE_TIMEOUT)
+    except HTTPException as e:
+        _record(model, time.perf_counter() - started, error_status=e.status_code)
+        raise
+    if validate and not validate(output):
+        _record(model, time.perf_counter() - started, error_status=INVALID_OUTPUT_STATUS)
+        raise HTTPException(status_code=INVALID_OUTPUT_STATUS, detail=f"Invalid response from {model}")
+    _record(model, time.perf_counter() - started)
+    return output
+
+
+def route_llm(task: str, prompt: str, temperature: float = 0.3, validate=None, speculative: bool = None) -> str:
+    """
+    Call the best available model for a task, falling back on 429 or timeout.
+
+    validate is an optional check on the output text; a model whose answer
+    fails it counts as failed and the next model is tried. In speculative
+    mode the first two models are raced and the first valid answer wins.
+    """
+    models = _ordered_models(task)
+    if speculative is None:
+        speculative = LLM_SPECULATIVE
+
+    if speculative and len(models) > 1:
+        pending = {
+            _speculative_pool.submit(_timed_call, model, prompt, temperature, validate)
+            for model in models[:2]
+        }
+        last_error = None
+        while pending:
+            done, pending = wait(pending, return_when=FIRST_COMPLETED)
+            for future in done:
+                try:
+                    return future.result()
+                except HTTPException as e:
+                    # Same rule as the sequential path: only "busy" or
+                    # invalid-output failures move on to another model
+                    if e.status_code not in FALLBACK_STATUSES + (INVALID_OUTPUT_STATUS,):
+                        raise
+                    last_error = e
+        models = models[2:]
+        if not models:
+            raise last_error
+
+    last_error = None
+    for model in models:
+        try:
+            return _timed_call(model, prompt, temperature, validate)
+        except HTTPException as e:
+            if e.status_code not in FALLBACK_STATUSES + (INVALID_OUTPUT_STATUS,):
+                raise
+            last_error = e
+    raise last_error
+
+
+def get_llm_stats() -> dict:
+    """Per-model call counts, moving-average latency and error rate."""
+    now = time.monotonic()
+    with _stats_lock:
+        return {
+            model: {
+                "calls": stats["calls"],
+                "errors": stats["errors"],
+                "latency_ms": round(stats["latency_ms"] or 0.0, 1),
+                "error_rate": round(stats["error_rate"], 3),
+                "cooling_down": stats["cooldown_until"] > now,
+            }
+            for model, stats in _model_stats.items()
+        }
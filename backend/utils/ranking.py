@@ -0,0 +1,95 @@
+import numpy as np
+
+
+def cosine_matrix(a, b) -> np.ndarray:
+    """Pairwise cosine similarity between the rows of a and the rows of b."""
+    a = np.asarray(a, dtype=np.float32)
+    b = np.asarray(b, dtype=np.float32)
+
+    a = a / np.clip(np.linalg.norm(a, axis=1, keepdims=True), 1e-12, None)
+    b = b / np.clip(np.linalg.norm(b, axis=1, keepdims=True), 1e-12, None)
+    return a @ b.T
+
+
+def mmr_rerank(query_scores, embeddings, k: int, lambda_mult: float = 0.7) -> list:
+    """
+    Pick up to k candidate indices using Maximal Marginal Relevance.
+
+    query_scores are the candidates' cosine similarities to the query and
+    embeddings their vectors, in the same order. The candidate-to-candidate
+    similarity matrix is computed once, so each greedy step is a single
+    vectorized update instead of a loop over pairs.
+    """
+    relevance = np.asarray(query_scores, dtype=np.float32)
+    n = len(relevance)
+    if n == 0 or k <= 0:
+        return []
+
+    pairwise = cosine_matrix(embeddings, embeddings)
+
+    selected = [int(np.argmax(relevance))]
+    max_sim = pairwise[selected[0]].copy()
+    available = np.ones(n, dtype=bool)
+    available[selected[0]] = False
+
+    while len(selected) < min(k, n):
+        mmr = lambda_mult * relevance - (1 - lambda_mult) * max_sim
+        mmr[~available] = -np.inf
+        best = int(np.argmax(mmr))
+
+        selected.append(best)
+        available[best] = False
+        np.maximum(max_sim, pairwise[best], out=max_sim)
+
+    return selected
+
+
+def find_near_duplicates(new_embeddings, existing_embeddings, threshold: float) -> list:
+    """
+    Match each new vector against existing vectors and earlier new vectors.
+
+    Returns one entry per new vector: None, or a (source, index, similarity)
+    tuple where source is "existing" or "batch". Existing matches win over
+    batch matches, and a batch match always points at an earlier vector.
+    """
+    n = len(new_embeddings)
+    if n == 0:
+        return []
+
+    matches = [None] * n
+
+    within = cosine_matrix(new_embeddings, new_embeddings)
+    within[np.triu_indices(n)] = -np.inf
+    batch_best = within.argmax(axis=1)
+    batch_sim = within[np.arange(n), batch_best]
+    for i in np.flatnonzero(batch_sim >= threshold):
+        matches[i] = ("batch", int(batch_best[i]), float(batch_sim[i]))
+
+    if len(existing_embeddings):
+        against = cosine_matrix(new_embeddings, existing_embeddings)
+        existing_best = against.argmax(axis=1)
+        existing_sim = against[np.arange(n), existing_best]
+        for i in np.flatnonzero(existing_sim >= threshold):
+            matches[i] = ("existing", int(existing_best[i]), float(existing_sim[i]))
+
+    return matches
+
+
+def resolve_duplicate_chains(matches: list, on_duplicate: str) -> list:
+    """
+    Re-point batch matches whose target is itself being dropped.
+
+    With "skip" or "merge", an entry that duplicates an earlier batch entry
+    which is in turn a duplicate must point at what that entry matched,
+    since the earlier one won't be inserted. Matches are resolved in order,
+    so one hop is always enough. "flag" inserts everything and is returned
+    unchanged.
+    """
+    resolved = list(matches)
+    if on_duplicate == "flag":
+        return resolved
+
+    for i, match in enumerate(resolved):
+        if match and match[0] == "batch" and resolved[match[1]]:
+            resolved[i] = resolved[match[1]][:2] + (match[2],)
+    return resolved
@@ -0,0 +1,68 @@
+import logging
+import os
+import threading
+import time
+from database import get_db
+
+logger = logging.getLogger(__name__)
+
+# Deleted experiences stay as empty tombstones this long so syncing clients
+# can learn about the delete, then the row is removed for good
+TOMBSTONE_RETENTION_DAYS = int(os.getenv("TOMBSTONE_RETENTION_DAYS", "30"))
+PURGE_INTERVAL = 3600
+
+_started = False
+
+
+def purge_tombstones() -> int:
+    """Delete tombstones older than the retention window. Returns rows removed."""
+    conn = get_db("write")
+    cur = conn.cursor()
+
+    try:
+        # Remember the highest version removed per user, so the change feed
+        # can tell a client with an older cursor that it missed deletes
+        cur.execute("""
+            WITH purged AS (
+                DELETE FROM experiences
+                WHERE deleted_at IS NOT NULL
+                  AND deleted_at < now() - make_interval(days => %s)
+                RETURNING user_id, version
+            ), horizons AS (
+                INSERT INTO experience_purge_horizons (user_id, version)
+                SELECT user_id, max(version) FROM purged GROUP BY user_id
+                ON CONFLICT (user_id) DO UPDATE
+                SET version = GREATEST(experience_purge_horizons.version, EXCLUDED.version)
+            )
+            SELECT count(*) FROM purged
+        """, (TOMBSTONE_RETENTION_DAYS,))
+        purged = cur.fetchone()[0]
+        conn.commit()
+        return purged
+    except Exception:
+        conn.rollback()
+        raise
+    finally:
+        cur.close()
+        conn.close()
+
+
+def _run():
+    while True:
+        try:
+            purged = purge_tombstones()
+            if purged:
+                logger.info("Purged %d expired tombstones", purged)
+        except Exception as e:
+            logger.error("Tombstone purge error: %s", e)
+
+        time.sleep(PURGE_INTERVAL)
+
+
+def start():
+    """Start the background purge thread once per process."""
+    global _started
+    if _started:
+        return
+    _started = True
+    threading.Thread(target=_run, name="tombstone-purge", daemon=True).start()